@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+# Hot math kernels for savannah.py
+# Optionally compiled with numba: sudo python3 -m pip install numba
+
+import numpy as np
+
+try:
+	from numba import njit, prange
+	HAVE_NUMBA = True
+except ImportError:
+	# No numba? Run the kernels as ordinary python functions.
+	HAVE_NUMBA = False
+	prange = range
+
+	def njit(*args, **kwargs):
+		def wrap(func):
+			return func
+		return wrap
+
+
+@njit(parallel=True, cache=True, fastmath=True)
+def tick_update(food, age, pregs, max_age, alive, food_per_tick, age_t):
+	'''Advance food, age and pregnancy for every live animal in parallel'''
+	for i in prange(food.shape[0]):
+		if not alive[i]:
+			continue
+		food[i] -= food_per_tick
+		if pregs[i] > 0:
+			food[i] -= food_per_tick / 3
+			pregs[i] += age_t
+		age[i] += age_t
+		if food[i] <= 0 or age[i] > max_age[i]:
+			alive[i] = False
+
+
+@njit(cache=True, fastmath=True)
+def get_speed(cur_age, max_age, max_speed):
+	'''Given the age and max speed, computer current speed'''
+	x = cur_age / max_age
+	if x > 1:
+		x = 1
+	if x < 0.5:
+		y = (-(2 * x - 1)**4 + 1)
+	else:
+		x -= 0.5
+		y = 5.1*x**3-6.4*x**2+0.6*x+1
+
+	if y <= 0.1:
+		y = 0.1
+	return y * max_speed
+
+
+@njit(cache=True, fastmath=True)
+def get_distance(x_1, y_1, x_2, y_2):
+	'''Distance between two points'''
+	return np.sqrt((y_2-y_1)**2+(x_2-x_1)**2)
+
+
+@njit(cache=True, fastmath=True)
+def calc_move(x_1, y_1, x_2, y_2, distance):
+	'''Move along a line from x_1,y_1 to x_2,y_2 at 1 unit of distance per tick'''
+
+	# Pregnancy can push speed negative; the old math moved by |distance| too
+	distance = abs(distance)
+	delta_x = x_2 - x_1
+	delta_y = y_2 - y_1
+	dist_2 = delta_x*delta_x + delta_y*delta_y
+
+	# Close enough to arrive this tick
+	if dist_2 <= distance*distance:
+		return x_2, y_2, delta_x, delta_y
+
+	# Scale the direction vector: one sqrt, one division, no sign fixups
+	scale = distance / np.sqrt(dist_2)
+	delta_x *= scale
+	delta_y *= scale
+	new_x = x_1 + delta_x
+	new_y = y_1 + delta_y
+	# Float rounding can land an epsilon past the target (and off the board
+	# when the target sits on an edge), so never step beyond it
+	new_x = min(new_x, x_2) if delta_x > 0 else max(new_x, x_2)
+	new_y = min(new_y, y_2) if delta_y > 0 else max(new_y, y_2)
+	return new_x, new_y, delta_x, delta_y
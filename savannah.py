@@ -1,16 +1,17 @@
 #!/usr/bin/python3
-# Requires mesa: sudo python3 m pip install mesa
+# Requires numpy + scipy: sudo python3 -m pip install numpy scipy
 # Requires tkinter: sudo apt install python3-tk
 
 import re
-import math
 import time
 import random
 import itertools
-import mesa.time
+import numpy as np
+from collections import namedtuple
 import tkinter as tk
-from mesa import Agent, Model
-from mesa.space import ContinuousSpace
+from scipy.spatial import cKDTree
+
+from kernels import calc_move, get_speed, get_distance, tick_update, HAVE_NUMBA
 
 
 # User configurable variables (via sliders)
@@ -27,20 +28,12 @@ RADIUS_TIGER = 9
 TICK_DELAY = 10
 
 
-def get_speed(cur_age, max_age, max_speed):
-	'''Given the age and max speed, computer current speed'''
-	x = cur_age / max_age
-	if x > 1:
-		x = 1
-	if x < 0.5:
-		y = (-(2 * x - 1)**4 + 1)
-	else:
-		x -= 0.5
-		y = 5.1*x**3-6.4*x**2+0.6*x+1
+# Patch color states: an int per state keyed to a Tk tag pool ("st0"...)
+GRASS_FULL, GRASS_BARE, ROCK = 0, 1, 2
+PATCH_COLORS = ("#00FF00", "#CAA800", "#908F8A")
 
-	if y <= 0.1:
-		y = 0.1
-	return y * max_speed
+# Shared kind markers so every type comparison is against one interned string
+GRASS, PREY, TIGER = 'Grass', 'Prey', 'Tiger'
 
 
 def norm_distro(center):
@@ -48,6 +41,36 @@ def norm_distro(center):
 	return (random.normalvariate(0, 0.2)+1) * center
 
 
+def ring_offsets(radius):
+	'''All integer (dx, dy) offsets within radius, sorted nearest first'''
+	span = int(radius)
+	offsets = [(d_x, d_y) for d_x in range(-span, span+1)
+			   for d_y in range(-span, span+1)
+			   if d_x*d_x + d_y*d_y <= radius*radius]
+	offsets.sort(key=lambda o: o[0]*o[0] + o[1]*o[1])
+	return offsets
+
+
+# Per animal state kept in packed numpy arrays on the model
+SOA_ARRAYS = ('age', 'food', 'pregs', 'max_age', 'alive', 'gender', 'mate_ok')
+
+# Snapshot of the slider globals taken at model creation, so the hot paths
+# read attributes off one local instead of doing LOAD_GLOBAL per constant
+Config = namedtuple('Config', ('food_per_tick', 'age_t', 'grass_regrow',
+							   'babies_tiger', 'babies_prey',
+							   'radius_prey', 'radius_tiger'))
+
+
+def soa_property(name):
+	'''Expose an animal's slot in the model's numpy arrays as an attribute'''
+	def fget(self):
+		return getattr(self.model, name)[self.idx]
+
+	def fset(self, value):
+		getattr(self.model, name)[self.idx] = value
+	return property(fget, fset)
+
+
 def pos_box(pos, size=8):
 	'''Get the CANVAS coords to draw a box on the grid'''
 	x_1, y_1 = pos
@@ -58,61 +81,169 @@ def pos_box(pos, size=8):
 	return (x_1, y_1, x_2, y_2)
 
 
-def get_distance(pos1, pos2):
-	'''Distance between two points'''
-	x_1, y_1 = pos1
-	x_2, y_2 = pos2
-	return math.sqrt((y_2-y_1)**2+(x_2-x_1)**2)
-
+class SpatialHash:
+	'''Uniform grid of buckets so radius searches only touch nearby cells
+	instead of scanning every agent on the board'''
+
+	def __init__(self, bucket_size):
+		# Sliders hand over floats; bucket coordinates must stay ints
+		self.size = max(int(bucket_size), 1)
+		self.buckets = {PREY: dict(), TIGER: dict()}
+
+	def cell(self, pos):
+		'''Bucket coordinates for a position'''
+		return (int(pos[0]) // self.size, int(pos[1]) // self.size)
+
+	def insert(self, obj, kind):
+		'''Add an object and return its bucket'''
+		cell = self.cell(obj.pos)
+		self.buckets[kind].setdefault(cell, set()).add(obj)
+		return cell
+
+	def remove(self, obj, kind, cell=None):
+		if cell is None:
+			cell = self.cell(obj.pos)
+		bucket = self.buckets[kind].get(cell)
+		if bucket:
+			bucket.discard(obj)
+
+	def move(self, obj, kind, old_cell):
+		'''Re-bucket an object that moved, return its current bucket'''
+		cell = self.cell(obj.pos)
+		if cell != old_cell:
+			self.remove(obj, kind, old_cell)
+			self.buckets[kind].setdefault(cell, set()).add(obj)
+		return cell
+
+	def query(self, pos, radius, kind, pool=None):
+		'''Find the nearest object of kind within radius, optionally only
+		considering members of pool (a set to intersect each bucket with)'''
+		buckets = self.buckets[kind]
+		x, y = pos
+		c_x, c_y = int(x) // self.size, int(y) // self.size
+		reach = int(radius // self.size) + 1
+		limit = radius * radius
+		best = None
+		best_dist = limit
+		for b_x in range(c_x - reach, c_x + reach + 1):
+			for b_y in range(c_y - reach, c_y + reach + 1):
+				bucket = buckets.get((b_x, b_y))
+				if not bucket:
+					continue
+				if pool is not None:
+					bucket = bucket & pool
+				for obj in bucket:
+					o_x, o_y = obj.pos
+					dist = (o_x - x)**2 + (o_y - y)**2
+					if dist <= best_dist:
+						best = obj
+						best_dist = dist
+		return best
+
+
+class BucketActivation:
+	'''Step animals bucket by bucket straight out of the SpatialHash.
+	A random starting bucket each tick plus a shuffle within each small
+	bucket keeps activation fair without shuffling the whole population.'''
+
+	def __init__(self, model):
+		self.model = model
+		self._agents = dict()
+
+	def add(self, agent):
+		self._agents[agent.uid] = agent
+
+	def remove(self, agent):
+		del self._agents[agent.uid]
 
-class Patch(Agent):
-	'''The physical content of a given cell'''
-
-	def __init__(self, uid, model):
-		super().__init__(uid, model)
+	def step(self):
+		buckets = []
+		for kind in self.model.hash.buckets.values():
+			buckets.extend(kind.values())
+		if not buckets:
+			return
+		# Snapshot every bucket before stepping anyone: agents re-bucket as
+		# they move, and must not be picked up again from a later bucket.
+		# Babies born mid-tick miss the snapshot, so like RandomActivation
+		# they wait for the next tick.
+		start = random.randrange(len(buckets))
+		order = []
+		for bucket in buckets[start:] + buckets[:start]:
+			group = list(bucket)
+			random.shuffle(group)
+			order.extend(group)
+		for agent in order:
+			if agent.uid in self._agents:
+				agent.step()
+
+
+class Patch:
+	'''The physical content of a given cell.
+	Plain __slots__ object: patches are never scheduled and live in the
+	model's patches grid for O(1) lookup by integer cell.'''
+
+	__slots__ = ('uid', 'model', 'pos', 'type', 'grass', 'state', 'canvas', 'icon')
+
+	def __init__(self, uid, model, pos):
 		self.uid = uid
+		self.model = model
+		self.pos = pos
+		self.canvas = None
+		self.icon = None
 		if random.random() < ROCKY_AREAS:
 			self.type = 'Rock'
+			self.state = ROCK
+			self.grass = 0
 		else:
-			self.type = 'Grass'
-
-		if self.type == 'Grass':
+			self.type = GRASS
+			self.state = GRASS_FULL
 			self.grass = 1.0
-		else:
-			self.grass = 0
 
 	def regrow(self):
 		self.grass = 1
-		self.update()
+		self.set_state(GRASS_FULL)
 
 	def get_color(self):
-		if self.grass >= 1:
-			return "#00FF00"
-		elif self.type == 'Rock':
-			return "#908F8A"
-		else:
-			return "#CAA800"
+		return PATCH_COLORS[self.state]
 
-	def update(self):
-		self.canvas.itemconfig(self.icon, fill=self.get_color())
+	def set_state(self, state):
+		'''Swap color-group tags; the model recolors each group once per tick'''
+		self.canvas.dtag(self.icon, 'st%d' % self.state)
+		self.canvas.addtag_withtag('st%d' % state, self.icon)
+		self.state = state
+		self.model.grass_recolor = True
 
 	def munch(self):
 		self.grass = 0
-		self.update()
-		step = int(self.model.step_num + GRASS_REGROW // AGE_T)
-		g = self.model.grass_ticks.get(step, [])
-		g.append(self)
-		self.model.grass_ticks[step] = g
+		self.set_state(GRASS_BARE)
+		model = self.model
+		ring = model.grass_ring
+		ring[(model.step_num + model.regrow_delay) % len(ring)].append(self)
 
 	def draw(self):
-		self.icon = self.canvas.create_rectangle(*pos_box(self.pos), tags="patch", fill=self.get_color())
+		self.icon = self.canvas.create_rectangle(*pos_box(self.pos),
+												 tags=("patch", 'st%d' % self.state),
+												 fill=self.get_color())
+
+
+class Animal:
+	'''Base Class for Predators and Prey.
+	Plain __slots__ object like Patch: attribute reads become fixed-offset
+	loads instead of __dict__ lookups on the per-tick hot path.'''
 
+	__slots__ = ('uid', 'model', 'idx', 'pos', 'target', 'colors', 'canvas',
+				 'icon', 'type', 'max_speed', 'speed', '_cell')
 
-class Animal(Agent):
-	'''Base Class for Predators and Prey'''
+	age = soa_property('age')
+	food = soa_property('food')
+	pregs = soa_property('pregs')
+	max_age = soa_property('max_age')
+	alive = soa_property('alive')
+	gender = soa_property('gender')
 
 	def __init__(self, uid, model, age):
-		super().__init__(uid, model)
+		self.model = model
+		self.idx = model.new_index(self)  # Slot in the model's agent arrays
 		self.gender = random.randint(0, 1)  # 0 = Female 1=Male
 		self.pregs = 0
 		self.uid = uid
@@ -126,6 +257,7 @@ class Animal(Agent):
 		self.type = ''			# The type of animal
 		self.max_age = 9
 		self.max_speed = 1
+		self._cell = None		# Current bucket in the model's SpatialHash
 
 	def can_mate(self):
 		'''Is this Animal ready to make babies?'''
@@ -147,8 +279,9 @@ class Animal(Agent):
 		return ' '.join(map(str, (self.pos, self.food)))+':'
 
 	def update(self):
-		self.canvas.itemconfig(self.icon,
-							   fill=self.colors[self.gender if not self.pregs else 2])
+		# Color changes are queued and flushed at the end of the tick
+		self.model.recolor.append(
+			(self.icon, self.colors[self.gender if not self.pregs else 2]))
 
 	def draw(self):
 		fill = self.colors[self.gender]
@@ -159,35 +292,23 @@ class Animal(Agent):
 
 	def step(self):
 		# print(self.type, int(self.food))
+		# Food, age and pregnancy advance in Prey_model.step as one numpy pass
 		if not self.alive:
 			self.kill()
 			return
-		self.food -= FOOD_PER_TICK
-		self.age += AGE_T
 		step = self.model.step_num
 
-		if self.food <= 0:
-			print(self, 'starved to death')
-			self.kill()
-			return
-		if self.age > self.max_age:
-			print(self, 'aged out')
-			self.kill()
-			return
-
-		if self.pregs:
-			self.food -= FOOD_PER_TICK / 3
-			self.pregs += AGE_T
-			if self.pregs >= 1:
-				self.pregs = 0
-				self.update()
-				babies = (random.normalvariate(0, 0.2)+1)
-				babies *= (BABIES_PER_TIGER_PREGS
-						   if self.type == 'Tiger' else BABIES_PER_PREY_PREGS)
-				babies = int(round(babies, 0))
-				print(self, "has given birth to", babies, 'babies')
-				for x in range(babies):
-					self.model.create_baby(*self.pos, type=self.type)
+		if self.pregs >= 1:
+			cfg = self.model.cfg
+			self.pregs = 0
+			self.update()
+			babies = (random.normalvariate(0, 0.2)+1)
+			babies *= (cfg.babies_tiger
+					   if self.type == TIGER else cfg.babies_prey)
+			babies = int(round(babies, 0))
+			print(self, "has given birth to", babies, 'babies')
+			for x in range(babies):
+				self.model.create_baby(*self.pos, type=self.type)
 
 		# Birthday
 		if step % 10 == 0:
@@ -201,34 +322,29 @@ class Animal(Agent):
 				print("Target has no position!", self, target)
 				self.target = None
 				return
-			new_pos, delta_x, delta_y = calc_move(*self.pos, *target.pos, self.speed)
-			# print("Moving:", self.pos, new_pos, delta_x, delta_y)
-			x, y = new_pos
-			if 0 > x > 80 or 0 > y > 80:
-				# Out of bounds (rare error)
-				print(vars(self), vars(target))
-				print(self.pos, new_pos)
-			self.model.space.move_agent(self, new_pos)
-			self.canvas.coords(self.icon, *pos_box(new_pos, size=12))
+			target_x, target_y = target.pos
+			x, y, delta_x, delta_y = calc_move(*self.pos, float(target_x), float(target_y), self.speed)
+			# print("Moving:", self.pos, x, y, delta_x, delta_y)
+			# No bounds check needed: calc_move never steps past the target
+			# and targets always sit on the board
+			self.pos = (x, y)
+			self._cell = self.model.hash.move(self, self.type, self._cell)
+			# Canvas pixels are grid units * 10; queued and flushed per tick
+			self.model.moves.append((self.icon, delta_x * 10, delta_y * 10))
 
 	def get_target(self):
-		# Look at cell neighbors and choose a target
-		# self.model.space.get_neighborhood(self.pos, moore=True, include_center=True)
-		# cellmates = self.model.space.get_cell_list_contents([self.pos])
-		space = self.model.space
-		cellmates = space.get_neighbors(self.pos, radius=3)
-		random.shuffle(cellmates)
-
+		# Look at nearby buckets and choose a target
+		model = self.model
 		target = self.target
 
 		# Eat the food in current cell or look to fornicate
-		if target and target.pos and get_distance(self.pos, target.pos) < .5:
-			if self.type == 'Prey' and target.type == 'Grass' and self.food < 80 and target.grass >= 1:
+		if target and target.pos and get_distance(*self.pos, *target.pos) < .5:
+			if self.type == PREY and target.type == GRASS and self.food < 80 and target.grass >= 1:
 				target.munch()
 				self.food += 10
 				return None
 
-			elif self.type == 'Tiger' and target.type == 'Prey' and self.food < 80:
+			elif self.type == TIGER and target.type == PREY and self.food < 80:
 				print(self, 'ate', target)
 				self.food += 40 + target.food / 4
 				target.alive = False
@@ -246,40 +362,32 @@ class Animal(Agent):
 		if target:
 			return target
 
-		# If low on food find a nearby food obj
+		# If low on food find the nearest food obj
 		if self.food < 80:
-			if self.type == 'Prey':
-				food_cells = space.get_neighbors(self.pos, radius=RADIUS_PREY)
-				random.shuffle(food_cells)
-				for obj in food_cells:
-					if obj.type == 'Grass':
-						if obj.grass >= 1:
-							return obj
+			if self.type == PREY:
+				target = model.scan_grass(self.pos, model.offsets_prey)
 			else:
-				food_cells = space.get_neighbors(self.pos, radius=RADIUS_TIGER)
-				# random.shuffle(food_cells) #unnecessary
-				for obj in food_cells:
-					if obj.type == 'Prey':
-						return obj
+				target = model.nearest(model.prey_tree, model.prey_list,
+									   self.pos, model.cfg.radius_tiger)
+			if target:
+				return target
 
 		# Otherwise if male, try to mate:
 		if self.gender == 1:
-			for obj in cellmates:
-				if self.type == obj.type and obj.can_mate():
-					# print(self, 'wants to mate with', obj)
-					return obj
+			target = model.query_eligible(self.pos, 3, self.type)
+			if target:
+				return target
 
 		# Nothing else to do? Wander.
-		for obj in cellmates:
-			if type(obj) == Patch and obj.type == 'Grass':
-				target = obj
-				return obj
+		return model.scan_grass(self.pos, model.offsets_wander)
 
 
 class Tiger(Animal):
+	__slots__ = ()
+
 	def __init__(self, uid, model, age=0):
 		super().__init__(uid, model, age)
-		self.type = 'Tiger'
+		self.type = TIGER
 		self.colors = ("#FF9933", "#FF8000", "#FFFF66")
 		self.max_speed = 2
 		self.max_age = norm_distro(LIFESPAN_TIGER)
@@ -289,9 +397,11 @@ class Tiger(Animal):
 
 class Prey(Animal):
 	'''An Animal that eats grass'''
+	__slots__ = ()
+
 	def __init__(self, uid, model, age=0):
 		super().__init__(uid, model, age)
-		self.type = 'Prey'
+		self.type = PREY
 		self.max_speed = 1  # Maximum possible speed when at adulthood
 		self.food = 10  	# 0-100
 		self.max_age = norm_distro(LIFESPAN_PREY)
@@ -299,67 +409,84 @@ class Prey(Animal):
 		self.set_speed()
 
 
-def calc_move(x_1, y_1, x_2, y_2, distance):
-	'''Move along a line from x_1,y_1 to x_2,y_2 at 1 unit of distance per tick'''
-
-	delta_y = y_2 - y_1
-	delta_x = x_2 - x_1
-	# print("To travel:", delta_x, delta_y)
-	if delta_y != 0:
-		ratio = delta_x / delta_y
-
-		delta_y = math.sqrt(distance**2 / (ratio**2 + 1)) * (-1 if delta_y < 0 else 1)
-		delta_x = abs(ratio * delta_y) * (-1 if delta_x < 0 else 1)
-	else:
-		delta_y = 0
-		delta_x = distance * (-1 if delta_x < 0 else 1)
-
-	if abs(delta_x) > abs(x_2 - x_1) or abs(delta_y) > abs(y_2 - y_1):
-		return (x_2, y_2), delta_x, delta_y
-	else:
-		return (x_1+delta_x, y_1+delta_y), delta_x, delta_y
-
-
-class Prey_model(Model):
+class Prey_model:
 	def __init__(self, Prey_count, Tiger_count, width, height, CANVAS):
 		self.count = 0  # Number of agents
-		self.schedule = mesa.time.RandomActivation(self)
-		self.space = ContinuousSpace(width+1, height+1, torus=False)
+		self.schedule = BucketActivation(self)
 		self.step_num = 0
 		self.last_uid = 0
 		self.canvas = CANVAS
-		self.grass_ticks = dict()
 		self.Prey_count = 0
 		self.Tiger_count = 0
-
-		# Create patches
+		self.cfg = Config(FOOD_PER_TICK, AGE_T, GRASS_REGROW,
+						  BABIES_PER_TIGER_PREGS, BABIES_PER_PREY_PREGS,
+						  RADIUS_PREY, RADIUS_TIGER)
+		self.hash = SpatialHash(max(self.cfg.radius_tiger, self.cfg.radius_prey))
+
+		# Ring buffer of munched patches; a patch regrows regrow_delay
+		# ticks after being eaten, so no dict scheduling is needed
+		self.regrow_delay = int(self.cfg.grass_regrow // self.cfg.age_t)
+		self.grass_ring = [[] for x in range(self.regrow_delay + 1)]
+
+		# Packed per-animal arrays (see SOA_ARRAYS), one slot per live animal
+		self.animals = []
+		self.n_agents = 0
+		self.age = np.zeros(512, dtype=np.float32)
+		self.food = np.zeros(512, dtype=np.float32)
+		self.pregs = np.zeros(512, dtype=np.float32)
+		self.max_age = np.zeros(512, dtype=np.float32)
+		self.alive = np.zeros(512, dtype=bool)
+		self.gender = np.zeros(512, dtype=np.int8)
+
+		# Females currently able to mate, kept in sync with the arrays
+		self.mate_ok = np.zeros(512, dtype=bool)
+		self.eligible = {PREY: set(), TIGER: set()}
+
+		# KD-tree rebuilt each tick so tigers can find the nearest prey
+		self.prey_tree = None
+		self.prey_list = []
+
+		# Constant search templates over the patches grid.
+		# offsets_wander gets reshuffled every few ticks for random wandering.
+		self.offsets_prey = ring_offsets(self.cfg.radius_prey)
+		self.offsets_wander = ring_offsets(3)
+
+		# Batched canvas updates, flushed once at the end of each tick
+		self.grass_recolor = False
+		self.recolor = []
+		self.moves = []
+
+		# Create patches in a grid indexed by integer cell for O(1) lookup
+		self.patches = np.empty((width, height), dtype=object)
 		for x, y in itertools.product(range(width), range(height)):
-			a = Patch(self.new_uid(), self)
-			# self.schedule.add(a)
-			self.space.place_agent(a, (x, y))
+			a = Patch(self.new_uid(), self, (x, y))
+			self.patches[x, y] = a
 			a.canvas = CANVAS
 			a.draw()
 
 		# Create Animals:
 		for i in range(Prey_count):
-			x = random.randrange(self.space.width)
-			y = random.randrange(self.space.width)
+			x = random.randrange(width + 1)
+			y = random.randrange(height + 1)
 			self.create_baby(x, y, age=random.randint(1, 5))
 		for i in range(Tiger_count):
-			x = random.randrange(self.space.width)
-			y = random.randrange(self.space.width)
-			self.create_baby(x, y, age=random.randint(1, 5), type='Tiger')
+			x = random.randrange(width + 1)
+			y = random.randrange(height + 1)
+			self.create_baby(x, y, age=random.randint(1, 5), type=TIGER)
 
 	def kill(self, a):
-		if a.type == 'Prey':
+		if a.type == PREY:
 			self.Prey_count -= 1
 		else:
 			self.Tiger_count -= 1
+		self.eligible[a.type].discard(a)
 		x_1, y_1 = pos_box(a.pos)[:2]
 		self.canvas.delete(a.icon)
 		self.count -= 1
-		self.space.remove_agent(a)
+		self.hash.remove(a, a.type, a._cell)
+		a.pos = None  # Anyone still targeting this animal drops it
 		self.schedule.remove(a)
+		self.free_index(a)
 		self.canvas.create_text(x_1, y_1, text="x", font=12, justify='center')
 
 	def new_uid(self):
@@ -368,34 +495,161 @@ class Prey_model(Model):
 		self.last_uid = uid
 		return uid
 
-	def create_baby(self, x, y, age=0, type='Prey'):
+	def new_index(self, a):
+		'''Claim a slot in the agent arrays, growing them if needed'''
+		idx = self.n_agents
+		if idx >= len(self.age):
+			for name in SOA_ARRAYS:
+				arr = getattr(self, name)
+				setattr(self, name, np.concatenate((arr, np.zeros_like(arr))))
+		for name in SOA_ARRAYS:
+			getattr(self, name)[idx] = 0  # Clear out any stale freed slot
+		self.animals.append(a)
+		self.n_agents += 1
+		return idx
+
+	def free_index(self, a):
+		'''Release a slot, swapping the last animal into it to stay packed'''
+		idx = a.idx
+		last = self.n_agents - 1
+		if idx != last:
+			for name in SOA_ARRAYS:
+				getattr(self, name)[idx] = getattr(self, name)[last]
+			mover = self.animals[last]
+			mover.idx = idx
+			self.animals[idx] = mover
+		self.animals.pop()
+		self.n_agents -= 1
+
+	def create_baby(self, x, y, age=0, type=PREY):
 		'''Create an animal and give it a ref to the CANVAS'''
-		if type == 'Prey':
+		if type == PREY:
 			a = Prey(self.new_uid(), self, age=age)
 			self.Prey_count += 1
 		else:
 			a = Tiger(self.new_uid(), self, age=age)
 			self.Tiger_count += 1
 		self.schedule.add(a)
-		self.space.place_agent(a, (x, y))
+		a.pos = (float(x), float(y))
+		a._cell = self.hash.insert(a, a.type)
 		self.count += 1
 		a.canvas = self.canvas
 		a.draw()
 
+	def query_eligible(self, pos, radius, kind):
+		'''Nearest ready-to-mate female of the given kind, or None'''
+		pool = self.eligible[kind]
+		if not pool:
+			return None
+		return self.hash.query(pos, radius, kind, pool=pool)
+
+	def build_trees(self):
+		'''Rebuild the per-tick KD-tree for nearest-prey queries'''
+		self.prey_list = [a for a in self.animals if a.type == PREY]
+		self.prey_tree = (cKDTree([a.pos for a in self.prey_list])
+						  if self.prey_list else None)
+
+	def scan_grass(self, pos, offsets):
+		'''Walk an offset template and return the first grassy patch'''
+		x, y = int(pos[0]), int(pos[1])
+		width, height = self.patches.shape
+		for d_x, d_y in offsets:
+			p_x, p_y = x + d_x, y + d_y
+			if 0 <= p_x < width and 0 <= p_y < height:
+				patch = self.patches[p_x, p_y]
+				if patch.grass >= 1:
+					return patch
+		return None
+
+	def nearest(self, tree, objs, pos, radius):
+		'''Closest member of a KD-tree within radius, or None'''
+		if tree is None:
+			return None
+		dist, idx = tree.query(pos, k=1, distance_upper_bound=radius)
+		if idx == len(objs):
+			return None
+		return objs[idx]
+
+	def flush_canvas(self):
+		'''Apply all queued canvas changes in one pass at the end of a tick'''
+		move = self.canvas.move
+		for icon, d_x, d_y in self.moves:
+			move(icon, d_x, d_y)
+		self.moves.clear()
+		if self.grass_recolor:
+			for state in (GRASS_FULL, GRASS_BARE):
+				self.canvas.itemconfig('st%d' % state, fill=PATCH_COLORS[state])
+			self.grass_recolor = False
+		itemconfig = self.canvas.itemconfig
+		for icon, color in self.recolor:
+			itemconfig(icon, fill=color)
+		self.recolor.clear()
+
 	def step(self):
 		self.step_num += 1
 		# print("Stepping:", self.step_num)
 
 		# Regrow any grass that's due
 		# Much faster than trying to call each individual grass cell as an agent every tick
-		if self.step_num in self.grass_ticks:
-			for grass in self.grass_ticks[self.step_num]:
-				grass.regrow()
-			del self.grass_ticks[self.step_num]
+		due = self.grass_ring[self.step_num % len(self.grass_ring)]
+		for grass in due:
+			grass.regrow()
+		due.clear()
+
+		# Age and feed the whole herd in one pass
+		n = self.n_agents
+		cfg = self.cfg
+		if n:
+			food = self.food[:n]
+			age = self.age[:n]
+			pregs = self.pregs[:n]
+			alive = self.alive[:n]
+			if HAVE_NUMBA and n > 500:
+				# The parallel kernel only beats numpy once the herd is big
+				# enough to cover the JIT dispatch cost
+				was_alive = alive.copy()
+				tick_update(food, age, pregs, self.max_age[:n], alive,
+							cfg.food_per_tick, cfg.age_t)
+				fallen = was_alive & ~alive
+			else:
+				food[alive] -= cfg.food_per_tick
+				food[alive & (pregs > 0)] -= cfg.food_per_tick / 3
+				age[alive] += cfg.age_t
+				pregs[alive & (pregs > 0)] += cfg.age_t
+				fallen = alive & ((food <= 0) | (age > self.max_age[:n]))
+				alive[fallen] = False
+			hungry = food <= 0
+			doomed = [(self.animals[i], hungry[i]) for i in np.where(fallen)[0]]
+			for a, starved in doomed:
+				print(a, 'starved to death' if starved else 'aged out')
+				self.kill(a)
+
+		# Refresh the ready-to-mate pools wherever eligibility flipped
+		n = self.n_agents
+		if n:
+			age = self.age[:n]
+			ok = ((self.gender[:n] == 0) & (self.pregs[:n] == 0)
+				  & (age > 1) & (age < 8)
+				  & (self.food[:n] > 50) & self.alive[:n])
+			for i in np.where(ok != self.mate_ok[:n])[0]:
+				a = self.animals[i]
+				if ok[i]:
+					self.eligible[a.type].add(a)
+				else:
+					self.eligible[a.type].discard(a)
+			self.mate_ok[:n] = ok
+
+		self.build_trees()
+
+		# Re-deal the wander template now and then so herds don't sync up
+		if self.step_num % 10 == 0:
+			random.shuffle(self.offsets_wander)
 
 		# Move the agents
 		self.schedule.step()
 
+		self.flush_canvas()
+
 		if self.count <= 0:
 			poem = '''
 			No sun - no moon
@@ -418,34 +672,10 @@ RESET_FLAG = False
 RUNNING_FLAG = False
 
 
-def repo_tkinter():
-	'''Reposition tkinter objects assuming ROOT is the main window'''
-	while True:
-		time.sleep(0.1)
-		root_x = ROOT.winfo_x()
-		root_y = ROOT.winfo_y()
-		mouse_x = ROOT.winfo_pointerx()
-		mouse_y = ROOT.winfo_pointery()
-		x = mouse_x - root_x
-		y = mouse_y - root_y
-		oid = str(ROOT.winfo_containing(mouse_x, mouse_y))[1:]
-
-		if oid in ROOT.children:
-			obj = ROOT.children[oid]
-			w = obj.winfo_width()
-			h = obj.winfo_height()
-			obj.place(x=(x-w/2))
-			obj.place(y=(y-h/2))
-			# obj.config(text=', '.join(map(str,(x,y))))
-			print(type(obj), oid, x, y)
-			ROOT.update()
-
-
 def repo(obj, x, y):
 	'''Reposition objects'''
 	print(type(obj), x, y, obj.winfo_width(), obj.winfo_height())
-	obj.place(x=x)
-	obj.place(y=y)
+	obj.place(x=x, y=y)
 
 
 def reset():
@@ -478,8 +708,10 @@ def run_simulation():
 		model.step()
 		if model.count == 0:
 			return
-		INFO_PREY.config(text="Prey:   "+str(model.Prey_count))
-		INFO_TIGER.config(text="Tigers: "+str(model.Tiger_count))
+		# Refreshing the labels every tick pumps Tk for no visible gain
+		if model.step_num % 10 == 0:
+			INFO_PREY.config(text="Prey:   "+str(model.Prey_count))
+			INFO_TIGER.config(text="Tigers: "+str(model.Tiger_count))
 		ROOT.after(int(TICK_DELAY), step)
 
 	for s in OPTS.children.values():
@@ -558,7 +790,7 @@ for name, description in sorted(GS.items()):
 
 
 # Resize window to fit Canvas
-ROOT.update()
+ROOT.update_idletasks()
 WIDTH = CANVAS.winfo_x() + CANVAS.winfo_width() + CANVAS_MARGIN
 HEIGHT = CANVAS.winfo_y() + CANVAS.winfo_height() + CANVAS_MARGIN
 ROOT.geometry(str(WIDTH)+'x'+str(HEIGHT))